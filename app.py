@@ -1,18 +1,47 @@
 import os
+import io
+import json
 import requests
+from requests.adapters import HTTPAdapter
 import streamlit as st
 import pandas as pd
+import fitz  # PyMuPDF
+import docx
 
 st.set_page_config(page_title="Recruitment Agent", layout="wide")
 
 BACKEND = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
 
+
+@st.cache_resource
+def _session() -> requests.Session:
+    # One pooled Session shared across Streamlit reruns: keep-alive avoids a
+    # fresh TCP handshake for every backend call.
+    s = requests.Session()
+    s.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=20))
+    return s
+
+
+def _extract_text(uploaded) -> str:
+    # Mirrors the backend's _read_upload_text: extract the JD to text once,
+    # client-side, so the match request can always send plain text and the
+    # backend never re-parses the file.
+    name = (uploaded.name or "").lower()
+    data = uploaded.getvalue()
+    if name.endswith(".pdf"):
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            return "\n".join(page.get_text("text") for page in doc)
+    if name.endswith((".docx", ".doc")):
+        d = docx.Document(io.BytesIO(data))
+        return "\n".join(p.text for p in d.paragraphs)
+    return data.decode("utf-8", errors="ignore")
+
 st.title("Recruitment Agent")
 
 with st.expander("Backend status"):
     st.write("Backend:", BACKEND)
     try:
-        r = requests.get(f"{BACKEND}/health", timeout=3)
+        r = _session().get(f"{BACKEND}/health", timeout=3)
         st.json(r.json())
     except Exception as e:
         st.error(f"Backend not reachable: {e}")
@@ -48,7 +77,7 @@ if jd_choice == "Generate JD (Gemini)":
             "location": location
         }
         try:
-            r = requests.post(f"{BACKEND}/generate_jd", json=payload, timeout=180)
+            r = _session().post(f"{BACKEND}/generate_jd", json=payload, timeout=180)
             r.raise_for_status()
             st.session_state["jd_text"] = r.json().get("job_description", "")
             st.success("JD generated successfully.")
@@ -66,11 +95,11 @@ elif jd_choice == "Upload JD file":
     jd_file = st.file_uploader("Upload JD (.pdf/.docx/.txt)", type=["pdf", "docx", "txt"])
     if jd_file:
         try:
-            txt = jd_file.getvalue().decode("utf-8", errors="ignore")
+            txt = _extract_text(jd_file)
             st.session_state["jd_text"] = txt
             st.text_area("JD preview (editable)", txt, height=350)
-        except Exception:
-            st.info("JD file uploaded; it will be sent to backend when you match resumes.")
+        except Exception as e:
+            st.error(f"Could not read JD file: {e}")
 
 else:  
     st.session_state["jd_text"] = st.text_area(
@@ -85,46 +114,48 @@ st.markdown("Upload resumes (PDF/DOCX/TXT). The system will use Gemini to score
 resumes = st.file_uploader("Upload resumes (up to 10)", type=["pdf", "docx", "txt"], accept_multiple_files=True)
 
 if st.button("Match Resumes"):
-    if not st.session_state.get("jd_text") and jd_choice != "Upload JD file":
+    if not st.session_state.get("jd_text"):
         st.error("No JD available. Generate, upload, or paste a JD first.")
-    elif jd_choice == "Upload JD file" and (not 'jd_file' in locals() or not jd_file):
-        st.error("You selected 'Upload JD file' — please upload a JD file first.")
     elif not resumes:
         st.error("Upload at least one resume.")
     else:
         files = []
-        data = {}
-        if jd_choice == "Upload JD file":
-            data["jd_mode"] = "file"
-            files.append(("jd_file", (jd_file.name, jd_file.getvalue(), jd_file.type or "application/octet-stream")))
-        else:
-            data["jd_mode"] = "text"
-            data["jd_text"] = st.session_state.get("jd_text", "")
+        # The JD is already extracted to text (even for uploaded files), so
+        # always send jd_mode='text' and skip the backend re-parse.
+        data = {"jd_mode": "text", "jd_text": st.session_state.get("jd_text", "")}
 
         for r in resumes:
             files.append(("resumes", (r.name, r.getvalue(), r.type or "application/octet-stream")))
 
+        matches = []
+        best = None
         try:
             with st.spinner("Scoring resumes with Gemini..."):
-                resp = requests.post(f"{BACKEND}/match_resumes", data=data, files=files, timeout=600)
+                resp = _session().post(f"{BACKEND}/match_resumes", data=data, files=files, timeout=600, stream=True)
                 resp.raise_for_status()
-                out = resp.json()
+                st.subheader("Matches (sorted by score)")
+                table_slot = st.empty()
+                # The backend streams NDJSON: one line per scored resume as it
+                # completes, then a final summary line with the best candidate.
+                for line in resp.iter_lines():
+                    if not line:
+                        continue
+                    obj = json.loads(line)
+                    if "filename" in obj:
+                        matches.append(obj)
+                        df = pd.DataFrame(matches)
+                        table_slot.dataframe(df[["filename", "score", "missing_skills", "remarks"]].sort_values("score", ascending=False), use_container_width=True)
+                    else:
+                        best = obj.get("best_candidate")
         except Exception as e:
             st.error(f"Matching failed: {e}")
-            out = None
-
-        if out:
-            matches = out.get("matches", [])
-            if not matches:
-                st.warning("No matches returned.")
-            else:
-                df = pd.DataFrame(matches)
-                st.subheader("Matches (sorted by score)")
-                st.dataframe(df[["filename", "score", "missing_skills", "remarks"]].sort_values("score", ascending=False), use_container_width=True)
-                st.session_state["last_matches"] = matches
-                best = out.get("best_candidate")
-                if best:
-                    st.success(f"Best candidate: {best['filename']} — Score: {best['score']}")
+
+        if not matches:
+            st.warning("No matches returned.")
+        else:
+            st.session_state["last_matches"] = matches
+            if best:
+                st.success(f"Best candidate: {best['filename']} — Score: {best['score']}")
 
 st.markdown("---")
 
@@ -139,24 +170,33 @@ if st.button("Generate Emails for last matches"):
     if not matches:
         st.error("No matching results found. Run matching first.")
     else:
+        jd_text = st.session_state.get("jd_text", "")
+        payloads = []
         for m in matches:
-            name = m.get("filename", "Candidate")
             score = int(m.get("score", 0))
-            status = "accept" if score >= threshold else "reject"
-            payload = {
-                "candidate_name": name,
+            payloads.append({
+                "candidate_name": m.get("filename", "Candidate"),
                 "job_title": " (from JD) ",
-                "jd_text": st.session_state.get("jd_text", ""),
+                "jd_text": jd_text,
                 "company": "",
-                "status": status,
+                "status": "accept" if score >= threshold else "reject",
                 "interview_date": interview_date,
                 "location": location
-            }
-            try:
-                r = requests.post(f"{BACKEND}/generate_email", json=payload, timeout=180)
+            })
+
+        # One backend call (and one Gemini call) covers the whole batch.
+        try:
+            with st.spinner("Generating emails..."):
+                r = _session().post(f"{BACKEND}/generate_emails_batch", json=payloads, timeout=300)
                 r.raise_for_status()
-                email_text = r.json().get("email", "")
-                st.subheader(f"{'INVITE' if status=='accept' else 'REJECT'} — {name} (score: {score})")
-                st.text_area(f"Email: {name}", value=email_text, height=180)
-            except Exception as e:
-                st.error(f"Failed to generate email for {name}: {e}")
\ No newline at end of file
+                emails = r.json().get("emails", [])
+        except Exception as e:
+            st.error(f"Email generation failed: {e}")
+            emails = []
+
+        for m, e in zip(matches, emails):
+            name = e.get("candidate_name", m.get("filename", "Candidate"))
+            score = int(m.get("score", 0))
+            status = e.get("status", "reject")
+            st.subheader(f"{'INVITE' if status=='accept' else 'REJECT'} — {name} (score: {score})")
+            st.text_area(f"Email: {name}", value=e.get("email", ""), height=180)
\ No newline at end of file